@@ -1,14 +1,11 @@
 import os
 import glob
+import numpy as np
 import pandas as pd
 
 def process_aggregate_file(filepath):
-    # Read with no header so we can grab the real header row ourselves
-    df_raw = pd.read_excel(filepath, header=None)
     # First row is the header
-    header = df_raw.iloc[0].tolist()
-    df = df_raw.iloc[1:].copy()
-    df.columns = header
+    df = pd.read_excel(filepath, header=0)
 
     # Identify stat columns (everything except Player and Season Group)
     stats_cols = [c for c in df.columns if c not in ('Player', 'Season Group')]
@@ -19,19 +16,19 @@ def process_aggregate_file(filepath):
     # Select only the "Difference" rows
     df_diff = df[df['Season Group'].astype(str).str.lower() == 'difference'].copy()
 
-    # Clean & convert stat columns to floats (strip '%' if present)
-    for col in stats_cols:
-        df_diff[col] = (
-            df_diff[col]
-            .astype(str)
-            .str.rstrip('%')         # remove trailing percent sign
-            .replace('nan', '')      # drop literal 'nan'
-            .astype(float)
-        )
+    # Stat columns read as numbers are already floats; only clean the text ones
+    # in one numpy pass (strip '%' if present)
+    text_cols = df_diff[stats_cols].select_dtypes(exclude='number').columns
+    if len(text_cols):
+        # str() each cell via an object array: to_numpy(dtype=str) sizes the array to the
+        # longest string and counts NaN as 'n', so one blank cell would truncate the column.
+        values = np.char.rstrip(df_diff[text_cols].to_numpy(dtype=object).astype(str), '%')
+        values = np.where(values == '', 'nan', values)     # empty cells become NaN
+        df_diff[text_cols] = values.astype(float)
 
     # Compute averages
     avg_per_stat = df_diff[stats_cols].mean()
-    overall_avg = df_diff[stats_cols].values.flatten().mean()
+    overall_avg = df_diff[stats_cols].to_numpy().mean()
 
     return num_players, avg_per_stat, overall_avg
 
@@ -1,7 +1,11 @@
 import os
-import glob
 import shutil
 
+def list_xls_files(folder):
+    # Single directory pass; DirEntry caches the file type so no extra stat per entry.
+    return [entry.path for entry in os.scandir(folder)
+            if entry.is_file() and entry.name.lower().endswith(".xls") and not entry.name.startswith(".")]
+
 def move_duplicates(folder1, folder2):
     # Create the "Duplicates" folder inside folder2 if it doesn't exist
     duplicates_folder = os.path.join(folder2, "Duplicates")
@@ -9,25 +13,24 @@ def move_duplicates(folder1, folder2):
         os.makedirs(duplicates_folder)
     
     # Get a set of XLS file names (with extension) from folder1
-    folder1_files = glob.glob(os.path.join(folder1, "*.xls"))
-    folder1_names = {os.path.basename(f) for f in folder1_files}
-    
-    # Get a list of XLS files from folder2
-    folder2_files = glob.glob(os.path.join(folder2, "*.xls"))
+    folder1_names = {os.path.basename(f) for f in list_xls_files(folder1)}
     
-    # Check each file in folder2; if its name exists in folder1, it's considered a duplicate.
-    duplicates = []
-    for f in folder2_files:
-        name = os.path.basename(f)
-        if name in folder1_names:
-            duplicates.append(f)
+    # "Duplicates" lives inside folder2, so moves are normally same-filesystem and a single
+    # rename is enough; shutil.move (copy + delete) is only needed across devices.
+    # os.replace (not os.rename) so an existing Duplicates/<name> is overwritten on Windows too.
+    same_device = os.stat(folder2).st_dev == os.stat(duplicates_folder).st_dev
+    mover = os.replace if same_device else shutil.move
     
-    # Move each duplicate file to the "Duplicates" folder
-    for file_path in duplicates:
-        dest_path = os.path.join(duplicates_folder, os.path.basename(file_path))
+    # Check each XLS file in folder2 (one directory scan); if its name exists in folder1,
+    # it's considered a duplicate and is moved to the "Duplicates" folder.
+    for file_path in list_xls_files(folder2):
+        name = os.path.basename(file_path)
+        if name not in folder1_names:
+            continue
+        dest_path = os.path.join(duplicates_folder, name)
         try:
-            shutil.move(file_path, dest_path)
-            print(f"Moved duplicate: {os.path.basename(file_path)}")
+            mover(file_path, dest_path)
+            print(f"Moved duplicate: {name}")
         except Exception as e:
             print(f"Error moving file {file_path}: {e}")
 
@@ -1,13 +1,85 @@
+import numpy as np
 import pandas as pd
 import sys
 import os
-import glob
-from openpyxl import load_workbook
-from openpyxl.styles import PatternFill
+import csv
+import io
+from contextlib import redirect_stdout
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 
 # Global list to store skipped player summaries (player, reason)
 skipped_summary = []
 
+# Position aliases grouped by standardized position (built once at import).
+LB_SET = frozenset({"LB", "OLB", "ILB", "MLB", "WLB", "WILL", "SLB", "SAM", "LILB", "LLB", "ROLB", "LOLB", "RLB", "MILB", "RILB"})
+CB_SET = frozenset({"CB", "NC", "NCB", "DC", "DCB", "DB", "RCB", "LCB"})
+RET_SET = frozenset({"RET", "KR", "PR"})
+OL_SET = frozenset({"T", "OT", "OG", "G", "C", "LG", "RG", "LT", "RT", "LS"})
+DL_SET = frozenset({"DE", "DT", "NT", "LDT", "RDT", "LDE", "RDE"})
+S_SET = frozenset({"FS", "SS"})
+FB_SET = frozenset({"FB"})
+TE_SET = frozenset({"TE"})
+K_SET = frozenset({"K"})
+P_SET = frozenset({"P"})
+WR_SET = frozenset({"WR"})
+RB_SET = frozenset({"RB"})
+QB_SET = frozenset({"QB"})
+
+# Flat alias -> standardized position lookup.
+POS_MAP = {alias: pos for aliases, pos in [
+    (LB_SET, "LB"),
+    (CB_SET, "CB"),
+    (RET_SET, "RET"),
+    (OL_SET, "OL"),
+    (DL_SET, "DL"),
+    (S_SET, "S"),
+    (FB_SET, "FB"),
+    (TE_SET, "TE"),
+    (K_SET, "K"),
+    (P_SET, "P"),
+    (WR_SET, "WR"),
+    (RB_SET, "RB"),
+    (QB_SET, "QB"),
+] for alias in aliases}
+
+# The same lookup as a Series, so a whole Pos column resolves with one reindex.
+POS_SERIES = pd.Series(POS_MAP)
+
+# Mapping of positions to their required stat columns.
+POS_COLUMNS = {
+    "QB": ["Yds", "Cmp%", "Int", "TD", "1D"],
+    "WR": ["Y/R", "Catch%", "Y/Tgt", "Succ%"],
+    "FB": ["Y/R", "Catch%", "Y/Tgt", "Succ%"],
+    "RB": ["Y/A", "Y/R", "Succ%", "1D"],
+    "TE": ["Y/R", "Catch%", "Y/Tgt", "Succ%"],
+    "OL": ["Comb", "Solo", "Ast"],
+    "DL": ["PD", "Comb", "Solo", "Ast"],
+    "LB": ["PD", "Comb", "Solo", "Ast"],
+    "CB": ["PD", "Comb", "Solo", "Ast"],
+    "S": ["PD", "Comb", "Solo", "Ast"],
+    "K": ["FG%", "Lng"],
+    "P": ["Y/P", "Lng"]
+}
+
+# Only these columns are ever used, so the sheet reader can skip every other column.
+NEEDED_COLUMNS = frozenset({"Season", "G", "Pos"}).union(*POS_COLUMNS.values())
+
+# Stat columns present in a file for a position, keyed by (position, column layout).
+stat_cols_by_pos = {}
+
+def stat_columns_for(final_pos, columns):
+    """
+    Return the stat columns for a position that exist in the file, as a tuple.
+    Cached per (position, column layout) since the exported sheets share a few fixed layouts.
+    """
+    key = (final_pos, tuple(columns))
+    if key not in stat_cols_by_pos:
+        available = frozenset(columns)
+        stat_cols_by_pos[key] = tuple(col for col in POS_COLUMNS.get(final_pos, []) if col in available)
+    return stat_cols_by_pos[key]
+
+@lru_cache(maxsize=256)
 def standardize_position(pos):
     """
     Standardize the position string.
@@ -22,48 +94,71 @@ def standardize_position(pos):
     - Otherwise, return the original uppercased position.
     """
     pos = str(pos).strip().upper()
-    lb_set = {"LB", "OLB", "ILB", "MLB", "WLB", "WILL", "SLB", "SAM", "LILB", "LLB", "ROLB", "LOLB", "RLB", "MILB", "RILB"}
-    cb_set = {"CB", "NC", "NCB", "DC", "DCB", "DB", "RCB", "LCB"}
-    ret_set = {"RET", "KR", "PR"}
-    ol_set = {"T", "OT", "OG", "G", "C", "LG", "RG", "LT", "RT", "LS"}
-    dl_set = {"DE", "DT", "NT", "LDT", "RDT", "LDE", "RDE"}
-    s_set = {"FS", "SS"}
-    fb_set = {"FB"}
-    te_set = {"TE"}
-    k_set = {"K"}
-    p_set = {"P"}
-    wr_set = {"WR"}
-    rb_set = {"RB"}
-    qb_set = {"QB"}
-    
-    if pos in lb_set:
-        return "LB"
-    elif pos in cb_set:
-        return "CB"
-    elif pos in ret_set:
-        return "RET"
-    elif pos in ol_set:
-        return "OL"
-    elif pos in dl_set:
-        return "DL"
-    elif pos in s_set:
-        return "S"
-    elif pos in fb_set:
-        return "FB"    
-    elif pos in te_set:
-        return "TE"
-    elif pos in k_set:
-        return "K"
-    elif pos in p_set:
-        return "P"
-    elif pos in wr_set:
-        return "WR"
-    elif pos in rb_set:
-        return "RB"
-    elif pos in qb_set:
-        return "QB"
-    else:
-        return pos
+    return POS_MAP.get(pos, pos)
+
+def standardize_positions(series):
+    """
+    Vectorized standardize_position for a whole Series of positions.
+    """
+    # str() each value via an object array so missing values become "nan" as in standardize_position
+    # (astype(str) keeps NaN; to_numpy(dtype=str) truncates str-dtype columns that contain NaN).
+    pos = np.char.upper(np.char.strip(series.to_numpy(dtype=object).astype(str)))
+    mapped = POS_SERIES.reindex(pos).to_numpy()
+    return pd.Series(np.where(pd.isna(mapped), pos, mapped), index=series.index, dtype=object)
+
+def _combine_season_rows(df):
+    """
+    Combine duplicate rows for the same season into one row per year (sorted by season).
+    - Numeric columns are averaged with a sorted-key NumPy reduction (np.unique + np.add.reduceat);
+      missing values are skipped, matching a pandas mean.
+    - Other columns keep the value from the season's first row.
+    """
+    if df.empty:
+        return df
+    num_cols = [col for col in df.columns if col != 'Season' and df[col].dtype.kind in 'biufc']
+    other_cols = [col for col in df.columns if col != 'Season' and col not in num_cols]
+
+    order = np.argsort(df['Season'].to_numpy(), kind='stable')
+    seasons, first_idx = np.unique(df['Season'].to_numpy()[order], return_index=True)
+    vals = df[num_cols].to_numpy(dtype=np.float64)[order]
+    present = ~np.isnan(vals)
+    sums = np.add.reduceat(np.where(present, vals, 0.0), first_idx, axis=0)
+    counts = np.add.reduceat(present.astype(np.int64), first_idx, axis=0)
+    with np.errstate(invalid='ignore'):
+        means = sums / counts
+
+    num_part = pd.DataFrame(means, index=pd.Index(seasons, name='Season'), columns=num_cols)
+    other_part = df.drop_duplicates('Season').set_index('Season')[other_cols]
+    return num_part.join(other_part).reset_index()[list(df.columns)]
+
+def _read_player_sheet(file_path):
+    """
+    Parse the player sheet (header on row 2).
+    - Only NEEDED_COLUMNS are loaded.
+    - Uses the Rust-based calamine engine when available.
+    - Falls back to xlrd if calamine is missing or cannot parse the file.
+    """
+    usecols = lambda col: col in NEEDED_COLUMNS
+    try:
+        return pd.read_excel(file_path, engine='calamine', header=1, usecols=usecols)
+    except Exception:
+        return pd.read_excel(file_path, engine='xlrd', header=1, usecols=usecols)
+
+def write_result_csv(result_df, output_filename):
+    """
+    Write a small result frame to CSV with float columns formatted to 2 decimals.
+    Produces the same file as to_csv(index=False, float_format="%.2f") without
+    going through pandas' CSV formatter, which dominates for a handful of rows.
+    Like to_csv, only float-dtype columns get the 2-decimal format; values in
+    other columns (e.g. a float in an object column) are written with str().
+    """
+    float_cols = [dtype.kind == 'f' for dtype in result_df.dtypes]
+    with open(output_filename, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f, lineterminator=os.linesep)
+        writer.writerow(result_df.columns)
+        for row in result_df.itertuples(index=False, name=None):
+            writer.writerow(["" if pd.isna(value) else f"{value:.2f}" if is_float else value
+                             for value, is_float in zip(row, float_cols)])
 
 def process_file(file_path):
     """
@@ -73,7 +168,8 @@ def process_file(file_path):
       - Determining the player's standardized position.
       - Selecting only the stat columns needed for that position.
       - Writing a CSV output where each row represents a season (kept in year order) without comparing differences.
-      - Updating an aggregate Excel file with the season-by-season stats.
+      - Returning (final_pos, result_df) so main_folder can aggregate the season-by-season stats.
+    Returns None if the file is skipped.
     """
     global skipped_summary
 
@@ -95,7 +191,7 @@ def process_file(file_path):
         print(f"\nProcessing player: {player_name}")
 
         # Read the .xls file with header on row 2.
-        df = pd.read_excel(file_path, engine='xlrd', header=1)
+        df = _read_player_sheet(file_path)
 
         # Convert 'Season' column to numeric; drop rows that cannot be converted
         df['Season'] = pd.to_numeric(df['Season'], errors='coerce')
@@ -113,40 +209,19 @@ def process_file(file_path):
         # In this modified version, we use all available season data.
         relevant_df = df.copy()
 
-        # Combine duplicate rows for the same season:
-        def agg_func(x):
-            if x.dtype.kind in 'biufc':
-                return x.mean()
-            else:
-                return x.iloc[0]
-        relevant_df = relevant_df.groupby('Season', as_index=False).agg(agg_func)
+        # Combine duplicate rows for the same season.
+        relevant_df = _combine_season_rows(relevant_df)
         relevant_df = relevant_df.sort_values(by='Season')
 
         # Standardize positions in the relevant data.
-        standardized_positions = relevant_df['Pos'].apply(standardize_position)
+        standardized_positions = standardize_positions(relevant_df['Pos'])
         unique_positions = standardized_positions.unique()
 
-        # Define the mapping of positions to their required stat columns.
-        pos_columns = {
-            "QB": ["Yds", "Cmp%", "Int", "TD", "1D"],
-            "WR": ["Y/R", "Catch%", "Y/Tgt", "Succ%"],
-            "FB": ["Y/R", "Catch%", "Y/Tgt", "Succ%"],
-            "RB": ["Y/A", "Y/R", "Succ%", "1D"],
-            "TE": ["Y/R", "Catch%", "Y/Tgt", "Succ%"],
-            "OL": ["Comb", "Solo", "Ast"],
-            "DL": ["PD", "Comb", "Solo", "Ast"],
-            "LB": ["PD", "Comb", "Solo", "Ast"],
-            "CB": ["PD", "Comb", "Solo", "Ast"],
-            "S": ["PD", "Comb", "Solo", "Ast"],
-            "K": ["FG%", "Lng"],
-            "P": ["Y/P", "Lng"]
-        }
-
         # If more than one standardized position is found, check if the stat sets are identical.
         if len(unique_positions) > 1:
             stat_sets = []
             for pos in unique_positions:
-                stats = set([stat for stat in pos_columns.get(pos, []) if stat in df.columns])
+                stats = set(stat_columns_for(pos, df.columns))
                 stat_sets.append(stats)
             if all(s == stat_sets[0] for s in stat_sets):
                 # Use the position from the latest season record.
@@ -164,7 +239,7 @@ def process_file(file_path):
             print(f"Standardized position: {final_pos}")
 
         # Check if the expected stat columns for the player's position exist.
-        stat_cols = [col for col in pos_columns.get(final_pos, []) if col in df.columns]
+        stat_cols = list(stat_columns_for(final_pos, df.columns))
         if not stat_cols:
             msg = f"Expected stat columns for position {final_pos} not found in file."
             print(f"Skipping {file_path}: {msg}")
@@ -182,55 +257,59 @@ def process_file(file_path):
         # Determine output folder: subfolder in the file's directory named after final_pos.
         file_dir = os.path.dirname(file_path)
         pos_folder = os.path.join(file_dir, final_pos)
-        if not os.path.exists(pos_folder):
-            os.makedirs(pos_folder)
+        os.makedirs(pos_folder, exist_ok=True)
 
         # Write individual CSV file.
         output_filename = os.path.join(pos_folder, base_filename + ".csv")
-        result_df.to_csv(output_filename, index=False, float_format="%.2f")
+        write_result_csv(result_df, output_filename)
         print(f"Individual CSV created: {output_filename}")
 
-        # Aggregate functionality: update aggregate Excel file with per-season data.
-        aggregate_filename = os.path.join(pos_folder, f"{final_pos}_aggregate.xlsx")
-        if os.path.exists(aggregate_filename):
-            try:
-                aggregate_df = pd.read_excel(aggregate_filename)
-            except Exception as e:
-                print(f"Error reading aggregate file: {e}")
-                aggregate_df = pd.DataFrame()
-        else:
-            aggregate_df = pd.DataFrame()
+        return final_pos, result_df
 
-        # Check for duplicate player name and skip if duplicate exists.
-        if not aggregate_df.empty and "Player" in aggregate_df.columns and player_name in aggregate_df["Player"].unique():
-            msg = "Duplicate player name in aggregate; skipping aggregate update."
-            print(f"Skipping aggregate update for {player_name}: {msg}")
-            return
+    except Exception as ex:
+        err_msg = f"An error occurred processing {file_path}: {ex}"
+        print(err_msg)
+        skipped_summary.append((player_name if 'player_name' in locals() else os.path.basename(file_path), err_msg))
 
-        aggregate_df = pd.concat([aggregate_df, result_df], ignore_index=True)
-        aggregate_df.to_excel(aggregate_filename, index=False)
-        print(f"Aggregate Excel file updated: {aggregate_filename}")
+def process_file_worker(file_path):
+    """
+    Run process_file in a worker process.
+    Returns (result, log_text, skipped) so the main process can print the log in file order
+    and merge the skipped entries, since neither stdout ordering nor globals survive the pool.
+    """
+    skipped_summary.clear()
+    buffer = io.StringIO()
+    with redirect_stdout(buffer):
+        result = process_file(file_path)
+    return result, buffer.getvalue(), list(skipped_summary)
 
-        # Apply alternating row colors (each row now represents one season).
+def read_aggregate(aggregate_filename):
+    """
+    Read an existing aggregate Excel file, or return an empty DataFrame if there is none.
+    """
+    if os.path.exists(aggregate_filename):
         try:
-            wb = load_workbook(aggregate_filename)
-            ws = wb.active
-            fill1 = PatternFill(start_color="CCFFCC", end_color="CCFFCC", fill_type="solid")  # Pale green
-            fill2 = PatternFill(start_color="FFFFBD", end_color="FFFFBD", fill_type="solid")  # Pale yellow
-            # Data rows start at row 2 (header in row 1)
-            for row in range(2, ws.max_row + 1):
-                fill = fill1 if (row % 2 == 0) else fill2
-                for col in range(1, ws.max_column + 1):
-                    ws.cell(row=row, column=col).fill = fill
-            wb.save(aggregate_filename)
-            print(f"Formatted aggregate Excel file saved: {aggregate_filename}")
+            return pd.read_excel(aggregate_filename)
         except Exception as e:
-            print(f"Error applying formatting: {e}")
+            print(f"Error reading aggregate file: {e}")
+    return pd.DataFrame()
 
-    except Exception as ex:
-        err_msg = f"An error occurred processing {file_path}: {ex}"
-        print(err_msg)
-        skipped_summary.append((player_name if 'player_name' in locals() else os.path.basename(file_path), err_msg))
+def write_aggregate(aggregate_filename, aggregate_df):
+    """
+    Write the full aggregate for a position once with xlsxwriter.
+    The alternating row colors (each row now represents one season) are added as conditional formats
+    at write time, so the workbook never has to be reopened and restyled.
+    """
+    with pd.ExcelWriter(aggregate_filename, engine="xlsxwriter") as writer:
+        aggregate_df.to_excel(writer, index=False, sheet_name="Sheet1")
+        ws = writer.sheets["Sheet1"]
+        fill1 = writer.book.add_format({"bg_color": "#CCFFCC"})  # Pale green
+        fill2 = writer.book.add_format({"bg_color": "#FFFFBD"})  # Pale yellow
+        # Data rows start at row 2 (header in row 1).
+        last_row, last_col = len(aggregate_df), len(aggregate_df.columns) - 1
+        ws.conditional_format(1, 0, last_row, last_col, {"type": "formula", "criteria": "=MOD(ROW(),2)=0", "format": fill1})
+        ws.conditional_format(1, 0, last_row, last_col, {"type": "formula", "criteria": "=MOD(ROW(),2)=1", "format": fill2})
+    print(f"Aggregate Excel file updated: {aggregate_filename}")
 
 def main_folder():
     global skipped_summary
@@ -240,18 +319,54 @@ def main_folder():
         print("Provided folder path does not exist or is not a directory.")
         sys.exit(1)
 
-    file_list = glob.glob(os.path.join(folder_path, "*.xls"))
+    # Single directory pass; DirEntry caches the file type so no extra stat per entry.
+    file_list = [entry.path for entry in os.scandir(folder_path)
+                 if entry.is_file() and entry.name.lower().endswith(".xls") and not entry.name.startswith(".")]
     if not file_list:
         print("No .xls files found in the provided folder.")
         sys.exit(0)
 
     print(f"Found {len(file_list)} .xls file(s) in the folder.")
-    for file_path in file_list:
-        try:
-            process_file(file_path)
-        except Exception as ex:
-            print(f"An error occurred processing {file_path}: {ex}")
-            skipped_summary.append((os.path.basename(file_path), str(ex)))
+    # Files are independent, so parsing and CSV writing fan out to a process pool;
+    # aggregates are only touched here in the main process.
+    results = []
+    with ProcessPoolExecutor() as executor:
+        futures = [(file_path, executor.submit(process_file_worker, file_path)) for file_path in file_list]
+        for file_path, future in futures:
+            try:
+                result, log_text, skipped = future.result()
+            except Exception as ex:
+                print(f"An error occurred processing {file_path}: {ex}")
+                skipped_summary.append((os.path.basename(file_path), str(ex)))
+                continue
+            print(log_text, end="")
+            skipped_summary.extend(skipped)
+            if result is not None:
+                results.append(result)
+
+    # Aggregate rows are buffered per position and each aggregate file is written once at the end.
+    agg_buffers = {}
+    seen_players = {}
+    updated_positions = set()
+    for final_pos, result_df in results:
+        if final_pos not in agg_buffers:
+            aggregate_df = read_aggregate(os.path.join(folder_path, final_pos, f"{final_pos}_aggregate.xlsx"))
+            agg_buffers[final_pos] = [aggregate_df] if not aggregate_df.empty else []
+            seen_players[final_pos] = set(aggregate_df["Player"]) if "Player" in aggregate_df.columns else set()
+
+        # Check for duplicate player name and skip if duplicate exists (do not log in summary)
+        player_name = result_df["Player"].iloc[0]
+        if player_name in seen_players[final_pos]:
+            msg = "Duplicate player name in aggregate; skipping aggregate update."
+            print(f"Skipping aggregate update for {player_name}: {msg}")
+            continue
+        seen_players[final_pos].add(player_name)
+        agg_buffers[final_pos].append(result_df)
+        updated_positions.add(final_pos)
+
+    for final_pos in sorted(updated_positions):
+        aggregate_filename = os.path.join(folder_path, final_pos, f"{final_pos}_aggregate.xlsx")
+        write_aggregate(aggregate_filename, pd.concat(agg_buffers[final_pos], ignore_index=True))
 
     # At the end of processing, print a summary of skipped files.
     non_duplicate_skips = [item for item in skipped_summary if "Duplicate player name" not in item[1]]